@@ -1,251 +1,500 @@
-import os
-import time
-import json
-import random
-import logging
-import threading
-from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
-
-API_BASE = os.getenv("MOCK_API_BASE", "https://mock-betting.local/api")
-USERNAME = os.getenv("BOT_USERNAME", "test_user")
-PASSWORD = os.getenv("BOT_PASSWORD", "test_pass")
-DEFAULT_STAKE = float(os.getenv("DEFAULT_STAKE", "5.0"))
-MAX_LEGS = int(os.getenv("MAX_LEGS", "4"))
-MIN_ODDS = float(os.getenv("MIN_ODDS", "1.20"))
-MAX_RETRIES = int(os.getenv("MAX_RETRIES", "5"))
-RETRY_BACKOFF_BASE = float(os.getenv("RETRY_BACKOFF_BASE", "1.5"))
-LOG_FILE = os.getenv("BOT_LOG_FILE", "accumulator_bot.log")
-MATCH_SELECTION_MODE = os.getenv("MATCH_SELECTION", "top")  
-SIMULATED_NETWORK_FAILURE_RATE = float(os.getenv("SIM_NET_FAIL", "0.05")) 
-
-logger = logging.getLogger("AccumulatorBotMock")
-logger.setLevel(logging.DEBUG)
-fh = logging.FileHandler(LOG_FILE)
-fh.setLevel(logging.DEBUG)
-ch = logging.StreamHandler()
-ch.setLevel(logging.INFO)
-formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-fh.setFormatter(formatter)
-ch.setFormatter(formatter)
-logger.addHandler(fh)
-logger.addHandler(ch)
-
-# ===== Mock API classes to simulate a bookmaker =====
-class MockAPIError(Exception):
-    pass
-
-class MockBettingAPI:
-    """
-    Simulated betting API. Replace this class in production with a real API client.
-    This mock supports:
-      - authenticate(username, password) -> session_token
-      - get_available_matches() -> list of matches with odds
-      - place_accumulator(session_token, legs, stake) -> {bet_id, status}
-      - get_bet(bet_id) -> bet status/details
-    """
-    def __init__(self):
-        self._sessions = {}
-        self._bets = {}
-        self._next_bet_id = 1000
-        random.seed(42)
-
-    def _maybe_network_failure(self):
-        if random.random() < SIMULATED_NETWORK_FAILURE_RATE:
-            raise MockAPIError("Simulated transient network error")
-
-    def authenticate(self, username: str, password: str) -> str:
-        self._maybe_network_failure()
-        if username == "" or password == "":
-            raise MockAPIError("Invalid credentials")
-        token = f"session-{random.randint(10000,99999)}"
-        self._sessions[token] = {"user": username, "issued": datetime.utcnow()}
-        return token
-
-    def get_available_matches(self) -> List[Dict[str, Any]]:
-        self._maybe_network_failure()
-        now = datetime.utcnow()
-        matches = []
-        # produce a list of 20 simulated matches with random odds and availability
-        for i in range(1, 21):
-            match = {
-                "match_id": f"M{i:03}",
-                "teams": (f"Team{i}A", f"Team{i}B"),
-                "start_time": (now + timedelta(minutes=30 + i*10)).isoformat(),
-                "odds": round(random.uniform(1.15, 3.5), 2),
-                "available": random.random() > 0.02  # 2% chance unavailable
-            }
-            matches.append(match)
-        return matches
-
-    def place_accumulator(self, session_token: str, legs: List[Dict[str, Any]], stake: float) -> Dict[str, Any]:
-        self._maybe_network_failure()
-        if session_token not in self._sessions:
-            raise MockAPIError("Invalid session")
-        # validate legs
-        for leg in legs:
-            if not leg.get("available", True):
-                raise MockAPIError(f"Leg {leg['match_id']} unavailable at placement")
-            if leg.get("odds", 0) < MIN_ODDS:
-                raise MockAPIError(f"Leg {leg['match_id']} odds too low")
-        # simulate acceptance with some chance of odds change
-        if random.random() < 0.08:
-            # simulate an odds change event
-            for leg in legs:
-                leg["odds"] = round(max(1.05, leg["odds"] * random.uniform(0.90, 1.12)), 2)
-            # 50% chance the platform rejects after odds change
-            if random.random() < 0.5:
-                raise MockAPIError("Odds changed during placement - please retry")
-        bet_id = f"B{self._next_bet_id}"
-        self._next_bet_id += 1
-        total_odd = 1.0
-        for leg in legs:
-            total_odd *= leg["odds"]
-        potential_return = round(stake * total_odd, 2)
-        self._bets[bet_id] = {
-            "bet_id": bet_id,
-            "user": self._sessions[session_token]["user"],
-            "legs": legs,
-            "stake": stake,
-            "placed_at": datetime.utcnow().isoformat(),
-            "status": "ACCEPTED",
-            "total_odd": round(total_odd, 2),
-            "potential_return": potential_return
-        }
-        return {"bet_id": bet_id, "status": "ACCEPTED", "total_odd": round(total_odd,2), "potential_return": potential_return}
-
-    def get_bet(self, bet_id: str) -> Dict[str, Any]:
-        self._maybe_network_failure()
-        if bet_id not in self._bets:
-            raise MockAPIError("Bet not found")
-        return self._bets[bet_id]
-
-# ===== Helper utilities =====
-def exponential_backoff(attempt: int) -> float:
-    # attempt starts at 1
-    return (RETRY_BACKOFF_BASE ** (attempt - 1)) + random.random() * 0.5
-
-def retry_on_exception(fn, max_retries=MAX_RETRIES, *args, **kwargs):
-    last_exc = None
-    for attempt in range(1, max_retries + 1):
-        try:
-            return fn(*args, **kwargs)
-        except Exception as e:
-            last_exc = e
-            wait = exponential_backoff(attempt)
-            logger.warning("Attempt %d/%d failed: %s. Backing off %.2fs", attempt, max_retries, str(e), wait)
-            time.sleep(wait)
-    logger.error("All %d attempts failed. Last error: %s", max_retries, str(last_exc))
-    raise last_exc
-
-# ===== Match selection logic =====
-def choose_matches(matches: List[Dict[str, Any]], mode: str = "top", max_legs: int = 4) -> List[Dict[str, Any]]:
-    available = [m for m in matches if m.get("available", True) and m.get("odds", 0) >= MIN_ODDS]
-    if not available:
-        return []
-    if mode == "random":
-        random.shuffle(available)
-        selected = available[:max_legs]
-    elif mode == "from_feed":
-        # placeholder: choose earliest starting matches
-        available.sort(key=lambda m: m["start_time"])
-        selected = available[:max_legs]
-    else:  # 'top' or default: choose highest odds while keeping odds reasonable
-        available.sort(key=lambda m: m["odds"], reverse=True)
-        selected = available[:max_legs]
-    return selected
-
-# ===== Main Bot Flow =====
-class AccumulatorBot:
-    def __init__(self, api_client: MockBettingAPI, username: str, password: str):
-        self.api = api_client
-        self.username = username
-        self.password = password
-        self.session_token: Optional[str] = None
-
-    def login(self):
-        logger.info("Logging in as %s", self.username)
-        token = retry_on_exception(self.api.authenticate, MAX_RETRIES, self.username, self.password)
-        self.session_token = token
-        logger.info("Authenticated, session token: %s", token)
-
-    def build_accumulator(self, stake: float, mode: str = MATCH_SELECTION_MODE, legs_target: int = MAX_LEGS) -> Dict[str, Any]:
-        logger.info("Fetching matches for accumulator build (mode=%s, legs=%d)", mode, legs_target)
-        matches = retry_on_exception(self.api.get_available_matches, MAX_RETRIES)
-        selected = choose_matches(matches, mode, legs_target)
-        if not selected or len(selected) < 2:
-            raise RuntimeError("Not enough valid legs available to form an accumulator")
-        logger.info("Selected legs: %s", [m["match_id"] for m in selected])
-        # transform legs into placement payload
-        legs_payload = [{"match_id": m["match_id"], "selection": m["teams"][0]+" vs "+m["teams"][1], "odds": m["odds"], "available": m["available"]} for m in selected]
-        return {"legs": legs_payload, "stake": stake}
-
-    def place_accumulator(self, placement: Dict[str, Any]) -> Dict[str, Any]:
-        if not self.session_token:
-            raise RuntimeError("Not authenticated")
-        logger.info("Placing accumulator with stake %s on %d legs", placement["stake"], len(placement["legs"]))
-        result = retry_on_exception(self.api.place_accumulator, MAX_RETRIES, self.session_token, placement["legs"], placement["stake"])
-        logger.info("Placement result: %s", result)
-        return result
-
-    def confirm_bet(self, bet_id: str) -> Dict[str, Any]:
-        logger.info("Confirming bet id %s", bet_id)
-        info = retry_on_exception(self.api.get_bet, MAX_RETRIES, bet_id)
-        logger.info("Bet info: %s", info)
-        return info
-
-    def run_once(self, stake: float = DEFAULT_STAKE):
-        try:
-            self.login()
-            placement = self.build_accumulator(stake)
-            placement_result = self.place_accumulator(placement)
-            bet_id = placement_result.get("bet_id")
-            if not bet_id:
-                logger.error("No bet_id returned from placement")
-                return
-            bet_info = self.confirm_bet(bet_id)
-            # final reporting — write to console and log file
-            logger.info("FINAL: bet_id=%s stake=%.2f total_odd=%s potential_return=%s", bet_info["bet_id"], bet_info["stake"], bet_info["total_odd"], bet_info["potential_return"])
-            # persist to a local JSON log
-            self._persist_bet(bet_info)
-        except Exception as e:
-            logger.exception("Run failed: %s", e)
-
-    def _persist_bet(self, bet_info: Dict[str, Any]):
-        out_file = "placed_bets.jsonl"
-        with open(out_file, "a", encoding="utf-8") as f:
-            f.write(json.dumps(bet_info, default=str) + "\n")
-        logger.info("Persisted bet to %s", out_file)
-
-# ===== If used as a scheduled script, support simple locking to avoid overlapping runs =====
-LOCKFILE = "accumulator_bot.lock"
-def acquire_lock(timeout=0):
-    if os.path.exists(LOCKFILE):
-        return False
-    with open(LOCKFILE, "w") as f:
-        f.write(str(os.getpid()))
-    return True
-
-def release_lock():
-    try:
-        if os.path.exists(LOCKFILE):
-            os.remove(LOCKFILE)
-    except Exception:
-        pass
-
-# ===== CLI entrypoint =====
-def main():
-    if not acquire_lock():
-        logger.error("Another instance appears to be running. Exiting.")
-        return
-    try:
-        api = MockBettingAPI()
-        bot = AccumulatorBot(api, USERNAME, PASSWORD)
-        logger.info("Starting accumulator bot run at %s", datetime.utcnow().isoformat())
-        bot.run_once()
-        logger.info("Run completed")
-    finally:
-        release_lock()
-
-if __name__ == "__main__":
-    main()
+import os
+import time
+import fcntl
+import atexit
+import orjson
+import random
+import queue
+import logging
+import logging.handlers
+import asyncio
+import numpy as np
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, asdict
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional
+
+API_BASE = os.getenv("MOCK_API_BASE", "https://mock-betting.local/api")
+USERNAME = os.getenv("BOT_USERNAME", "test_user")
+PASSWORD = os.getenv("BOT_PASSWORD", "test_pass")
+DEFAULT_STAKE = float(os.getenv("DEFAULT_STAKE", "5.0"))
+MAX_LEGS = int(os.getenv("MAX_LEGS", "4"))
+MIN_ODDS = float(os.getenv("MIN_ODDS", "1.20"))
+MAX_RETRIES = int(os.getenv("MAX_RETRIES", "5"))
+RETRY_BACKOFF_BASE = float(os.getenv("RETRY_BACKOFF_BASE", "1.5"))
+LOG_FILE = os.getenv("BOT_LOG_FILE", "accumulator_bot.log")
+MATCH_SELECTION_MODE = os.getenv("MATCH_SELECTION", "top")
+SIMULATED_NETWORK_FAILURE_RATE = float(os.getenv("SIM_NET_FAIL", "0.05"))
+NUM_BETS = int(os.getenv("NUM_BETS", "1"))  # how many bets to run concurrently per invocation
+BATCH_MAX = int(os.getenv("BATCH_MAX", "32"))  # max bet lookups coalesced into one get_bets call
+BATCH_WAIT_MS = float(os.getenv("BATCH_WAIT_MS", "50"))  # how long to wait for more lookups to coalesce
+MATCHES_TTL = float(os.getenv("MATCHES_TTL", "10"))  # seconds a fetched match list stays fresh
+MAX_CONCURRENT = int(os.getenv("MAX_CONCURRENT", "8"))  # cap on simultaneous in-flight API calls
+BETS_FILE = os.getenv("BOT_BETS_FILE", "placed_bets.jsonl")
+PERSIST_FLUSH_EVERY = int(os.getenv("PERSIST_FLUSH_EVERY", "8"))  # bets written between explicit flushes
+BET_HISTORY_CAP = int(os.getenv("BET_HISTORY_CAP", "10000"))  # bets kept in the mock's in-memory store
+
+# orjson serializes datetimes (and numpy scalars) natively in C and appends the
+# newline itself, so _persist_bet emits one ready-to-write bytes object per bet
+_ORJSON_OPTS = orjson.OPT_APPEND_NEWLINE | orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_NUMPY
+
+logger = logging.getLogger("AccumulatorBotMock")
+logger.setLevel(logging.DEBUG)
+fh = logging.handlers.RotatingFileHandler(LOG_FILE, maxBytes=5_000_000, backupCount=3, delay=True)
+fh.setLevel(logging.DEBUG)
+ch = logging.StreamHandler()
+ch.setLevel(logging.INFO)
+formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+fh.setFormatter(formatter)
+ch.setFormatter(formatter)
+# records go through a queue so emitting a log is a non-blocking put; the
+# listener thread does the formatting and handler I/O off the event loop
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+_log_listener = logging.handlers.QueueListener(_log_queue, fh, ch, respect_handler_level=True)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
+# ===== Mock API classes to simulate a bookmaker =====
+class MockAPIError(Exception):
+    pass
+
+class TransientAPIError(MockAPIError):
+    """Retryable: the same call may succeed shortly (network blip, odds race)."""
+
+class PermanentAPIError(MockAPIError):
+    """Deterministic failure: retrying cannot change the outcome."""
+
+@dataclass
+class MatchTable:
+    """
+    Struct-of-arrays view of the match feed: consumers touch only the columns
+    they need (odds/availability for selection, ids/teams for the payload), so
+    selection and validation are contiguous array ops instead of per-dict
+    hash lookups. JSON-shaped legs are materialized only at placement time.
+    """
+    ids: np.ndarray        # match_id strings (object dtype)
+    teams: np.ndarray      # (n, 2) object array of team names
+    selection: np.ndarray  # precomputed "home vs away" strings (object dtype)
+    start: np.ndarray      # unix epoch seconds (int64); format to ISO only on emit
+    odds: np.ndarray       # float32
+    avail: np.ndarray      # bool
+
+    def __len__(self) -> int:
+        return self.ids.size
+
+    def start_iso(self, i: int) -> str:
+        return datetime.fromtimestamp(int(self.start[i]), timezone.utc).isoformat()
+
+@dataclass(slots=True)
+class BetRecord:
+    """Slotted bet row: ~a third smaller than the old 8-key dict per bet."""
+    bet_id: str
+    user: str
+    legs: List[Dict[str, Any]]
+    stake: float
+    placed_at: str
+    status: str
+    total_odd: float
+    potential_return: float
+
+class MockBettingAPI:
+    """
+    Simulated betting API. Replace this class in production with a real API client
+    (e.g. one backed by an aiohttp.ClientSession with a shared, limited connector).
+    This mock supports:
+      - authenticate(username, password) -> session_token
+      - get_available_matches() -> list of matches with odds
+      - place_accumulator(session_token, legs, stake) -> {bet_id, status}
+      - get_bet(bet_id) -> bet status/details
+    All methods are coroutines so many bets can be interleaved on one event loop.
+    """
+    def __init__(self):
+        self._sessions = {}
+        # bounded LRU of BetRecords: long fleet runs no longer grow without limit
+        self._bets: OrderedDict = OrderedDict()
+        self._next_bet_id = 1000
+        self._matches_cache: Optional[tuple] = None  # (fetched_at, matches)
+        self._sem = asyncio.Semaphore(MAX_CONCURRENT)
+        self._waiting = 0
+        self._in_flight = 0
+        self._rng = np.random.default_rng(42)  # vectorized draws for match generation
+        random.seed(42)  # legacy seed kept for tokens / failure rolls
+
+    @asynccontextmanager
+    async def _slot(self):
+        # bounds outstanding requests so retry storms cannot amplify a failure;
+        # also keeps the queue-depth counters for stats() honest
+        self._waiting += 1
+        async with self._sem:
+            self._waiting -= 1
+            self._in_flight += 1
+            try:
+                yield
+            finally:
+                self._in_flight -= 1
+
+    def stats(self) -> Dict[str, int]:
+        return {"waiting": self._waiting, "in_flight": self._in_flight}
+
+    def _maybe_network_failure(self):
+        if random.random() < SIMULATED_NETWORK_FAILURE_RATE:
+            raise TransientAPIError("Simulated transient network error")
+
+    async def authenticate(self, username: str, password: str) -> str:
+        async with self._slot():
+            self._maybe_network_failure()
+            if username == "" or password == "":
+                raise PermanentAPIError("Invalid credentials")
+            token = f"session-{random.randint(10000,99999)}"
+            self._sessions[token] = {"user": username, "issued": datetime.utcnow()}
+            return token
+
+    async def get_available_matches(self) -> MatchTable:
+        # serve from the TTL cache when fresh: staleness is bounded by MATCHES_TTL,
+        # and bursty callers (fleet runs, retries) skip the round-trip entirely
+        if self._matches_cache is not None:
+            fetched_at, cached = self._matches_cache
+            if time.monotonic() - fetched_at < MATCHES_TTL:
+                return cached
+        async with self._slot():
+            self._maybe_network_failure()
+            # produce 20 simulated matches as parallel columns; odds, availability
+            # and start times all come from vectorized draws/arithmetic. Start
+            # times stay as epoch ints (one allocation for the whole column,
+            # integer compares in selection) until someone emits them as ISO.
+            n = 20
+            base = int(datetime.now(timezone.utc).timestamp())
+            table = MatchTable(
+                ids=np.array([f"M{i:03}" for i in range(1, n + 1)], dtype=object),
+                teams=np.array([[f"Team{i}A", f"Team{i}B"] for i in range(1, n + 1)], dtype=object),
+                # a match's display string never changes, so build it once here
+                # instead of concatenating team names on every payload build
+                selection=np.array([f"Team{i}A vs Team{i}B" for i in range(1, n + 1)], dtype=object),
+                start=base + 1800 + np.arange(1, n + 1, dtype=np.int64) * 600,
+                odds=np.round(self._rng.uniform(1.15, 3.5, n), 2).astype(np.float32),
+                avail=self._rng.random(n) > 0.02,  # 2% chance unavailable
+            )
+            self._matches_cache = (time.monotonic(), table)
+            return table
+
+    async def place_accumulator(self, session_token: str, legs: List[Dict[str, Any]], stake: float) -> Dict[str, Any]:
+        async with self._slot():
+            self._maybe_network_failure()
+            if session_token not in self._sessions:
+                raise PermanentAPIError("Invalid session")
+            # pull odds/availability into arrays once, then validate, (maybe)
+            # shift, and reduce without re-walking the leg dicts three times
+            odds = np.fromiter((leg.get("odds", 0) for leg in legs), dtype=np.float64, count=len(legs))
+            avail = np.fromiter((leg.get("available", True) for leg in legs), dtype=bool, count=len(legs))
+            if not avail.all():
+                raise PermanentAPIError(f"Leg {legs[int(np.argmin(avail))]['match_id']} unavailable at placement")
+            low = odds < MIN_ODDS
+            if low.any():
+                raise PermanentAPIError(f"Leg {legs[int(np.argmax(low))]['match_id']} odds too low")
+            # simulate acceptance with some chance of odds change
+            if random.random() < 0.08:
+                # odds change event: one vectorized mul/clip/round, written back once
+                odds = np.round(np.clip(odds * self._rng.uniform(0.90, 1.12, odds.size), 1.05, None), 2)
+                for leg, odd in zip(legs, odds):
+                    leg["odds"] = float(odd)
+                # 50% chance the platform rejects after odds change
+                if random.random() < 0.5:
+                    raise TransientAPIError("Odds changed during placement - please retry")
+            bet_id = f"B{self._next_bet_id}"
+            self._next_bet_id += 1
+            total_odd = float(odds.prod())
+            potential_return = round(stake * total_odd, 2)
+            self._bets[bet_id] = BetRecord(
+                bet_id=bet_id,
+                user=self._sessions[session_token]["user"],
+                legs=legs,
+                stake=stake,
+                placed_at=datetime.utcnow().isoformat(),
+                status="ACCEPTED",
+                total_odd=round(total_odd, 2),
+                potential_return=potential_return,
+            )
+            while len(self._bets) > BET_HISTORY_CAP:
+                self._bets.popitem(last=False)  # evict the least recently used bet
+            return {"bet_id": bet_id, "status": "ACCEPTED", "total_odd": round(total_odd,2), "potential_return": potential_return}
+
+    def _bet_view(self, bet_id: str) -> Dict[str, Any]:
+        record = self._bets[bet_id]
+        self._bets.move_to_end(bet_id)
+        return asdict(record)
+
+    async def get_bet(self, bet_id: str) -> Dict[str, Any]:
+        async with self._slot():
+            self._maybe_network_failure()
+            if bet_id not in self._bets:
+                raise PermanentAPIError("Bet not found")
+            return self._bet_view(bet_id)
+
+    async def get_bets(self, bet_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        # batch lookup: one round-trip for many bet ids; unknown ids are simply omitted
+        async with self._slot():
+            self._maybe_network_failure()
+            return {bet_id: self._bet_view(bet_id) for bet_id in bet_ids if bet_id in self._bets}
+
+# ===== Helper utilities =====
+# MAX_RETRIES is small, so the whole power series fits in a tuple computed once
+# at import instead of a float pow per retry
+_BACKOFF = tuple(RETRY_BACKOFF_BASE ** i for i in range(MAX_RETRIES))
+
+def exponential_backoff(attempt: int) -> float:
+    # attempt starts at 1; attempts past the table reuse its last entry
+    return _BACKOFF[min(attempt, len(_BACKOFF)) - 1] + random.random() * 0.5
+
+# Recovery signal shared by all retry loops: cleared when a call fails, set again
+# by the first sibling attempt that succeeds. Every successful call doubles as a
+# health probe, so backed-off coroutines wake as soon as the transient clears
+# instead of sleeping out their full backoff window.
+_api_ok = asyncio.Event()
+_api_ok.set()
+
+async def retry_on_exception(fn, max_retries=MAX_RETRIES, *args, **kwargs):
+    last_exc = None
+    for attempt in range(1, max_retries + 1):
+        try:
+            result = await fn(*args, **kwargs)
+            _api_ok.set()
+            return result
+        # only transient failures are worth the backoff; permanent errors
+        # (bad credentials, invalid legs, unknown bets) propagate immediately
+        except TransientAPIError as e:
+            last_exc = e
+            wait = exponential_backoff(attempt)
+            logger.warning("Attempt %d/%d failed: %s. Backing off %.2fs", attempt, max_retries, str(e), wait)
+            _api_ok.clear()
+            try:
+                # the backoff (with jitter) is a ceiling, not a mandatory sleep:
+                # a recovery signal ends the wait early
+                await asyncio.wait_for(_api_ok.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+    logger.error("All %d attempts failed. Last error: %s", max_retries, str(last_exc))
+    raise last_exc
+
+class BetBatcher:
+    """
+    Coalesces concurrent get_bet(bet_id) lookups into a single get_bets([...]) call.
+    Callers submit a bet_id and await a Future; a background task drains the queue
+    once BATCH_WAIT_MS has passed (or BATCH_MAX ids are waiting) and resolves every
+    caller from one round-trip. Duplicate concurrent asks for the same bet_id share
+    one Future, so N waiters still cost one request.
+    """
+    def __init__(self, api: MockBettingAPI, max_batch: int = BATCH_MAX, max_wait_ms: float = BATCH_WAIT_MS):
+        self.api = api
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._drain_task: Optional[asyncio.Task] = None
+
+    async def submit(self, bet_id: str) -> Dict[str, Any]:
+        if self._drain_task is None:
+            self._drain_task = asyncio.create_task(self._drain())
+        fut = self._pending.get(bet_id)
+        if fut is None:
+            fut = asyncio.get_running_loop().create_future()
+            self._pending[bet_id] = fut
+            self._queue.put_nowait(bet_id)
+        return await fut
+
+    async def _drain(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            # gather more ids until the window closes or the batch is full
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            futures = {bet_id: self._pending.pop(bet_id) for bet_id in batch}
+            try:
+                results = await retry_on_exception(self.api.get_bets, MAX_RETRIES, batch)
+            except Exception as e:
+                for fut in futures.values():
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            for bet_id, fut in futures.items():
+                if fut.done():
+                    continue
+                if bet_id in results:
+                    fut.set_result(results[bet_id])
+                else:
+                    fut.set_exception(PermanentAPIError("Bet not found"))
+
+# ===== Match selection logic =====
+def choose_matches(table: MatchTable, mode: str = "top", max_legs: int = 4) -> np.ndarray:
+    """Return indices into `table` of the selected legs (possibly empty)."""
+    empty = np.empty(0, dtype=np.intp)
+    if len(table) == 0:
+        return empty
+    # vectorized filter: one mask over the contiguous odds/availability columns
+    candidates = np.nonzero(table.avail & (table.odds >= MIN_ODDS))[0]
+    if candidates.size == 0:
+        return empty
+    k = min(max_legs, candidates.size)
+    if mode == "random":
+        idx = np.array(random.sample(list(candidates), k), dtype=np.intp)
+    elif mode == "from_feed":
+        # choose earliest starting matches; plain integer sort on the epoch column
+        idx = candidates[np.argsort(table.start[candidates], kind="stable")[:k]]
+    else:  # 'top' or default: highest odds, selected via argpartition (no full sort)
+        cand_odds = table.odds[candidates]
+        top = np.argpartition(-cand_odds, k - 1)[:k]
+        idx = candidates[top[np.argsort(-cand_odds[top], kind="stable")]]
+    return idx
+
+# ===== Main Bot Flow =====
+class AccumulatorBot:
+    def __init__(self, api_client: MockBettingAPI, username: str, password: str):
+        self.api = api_client
+        self.username = username
+        self.password = password
+        self.session_token: Optional[str] = None
+        self.batcher = BetBatcher(api_client)
+        # one long-lived, write-buffered handle instead of open/write/close per bet;
+        # flushed every few bets and closed (which flushes) at interpreter exit
+        self._persist_fp = open(BETS_FILE, "ab", buffering=65536)
+        self._persist_count = 0
+        atexit.register(self._persist_fp.close)
+
+    async def login(self):
+        logger.info("Logging in as %s", self.username)
+        token = await retry_on_exception(self.api.authenticate, MAX_RETRIES, self.username, self.password)
+        self.session_token = token
+        logger.info("Authenticated, session token: %s", token)
+
+    async def build_accumulator(self, stake: float, mode: str = MATCH_SELECTION_MODE, legs_target: int = MAX_LEGS,
+                                table: Optional[MatchTable] = None) -> Dict[str, Any]:
+        if table is None:
+            logger.info("Fetching matches for accumulator build (mode=%s, legs=%d)", mode, legs_target)
+            table = await retry_on_exception(self.api.get_available_matches, MAX_RETRIES)
+        idx = choose_matches(table, mode, legs_target)
+        if idx.size < 2:
+            raise RuntimeError("Not enough valid legs available to form an accumulator")
+        if logger.isEnabledFor(logging.INFO):
+            # only materialize the id list when something will actually log it
+            logger.info("Selected legs: %s", list(table.ids[idx]))
+        # materialize the JSON-shaped placement payload only now, from the table columns
+        legs_payload = [
+            {
+                "match_id": table.ids[i],
+                "selection": table.selection[i],
+                # round away float32 noise from the table column: odds are
+                # 2-decimal quantities in the payload and the persisted JSONL
+                "odds": round(float(table.odds[i]), 2),
+                "available": bool(table.avail[i]),
+            }
+            for i in idx
+        ]
+        return {"legs": legs_payload, "stake": stake}
+
+    async def place_accumulator(self, placement: Dict[str, Any]) -> Dict[str, Any]:
+        if not self.session_token:
+            raise RuntimeError("Not authenticated")
+        logger.info("Placing accumulator with stake %s on %d legs", placement["stake"], len(placement["legs"]))
+        result = await retry_on_exception(self.api.place_accumulator, MAX_RETRIES, self.session_token, placement["legs"], placement["stake"])
+        logger.info("Placement result: %s", result)
+        return result
+
+    async def confirm_bet(self, bet_id: str) -> Dict[str, Any]:
+        logger.info("Confirming bet id %s", bet_id)
+        info = await self.batcher.submit(bet_id)
+        logger.info("Bet info: %s", info)
+        return info
+
+    async def run_once(self, stake: float = DEFAULT_STAKE):
+        try:
+            # login and the match fetch are independent until placement, so
+            # overlap them and take one round-trip off the critical path
+            _, table = await asyncio.gather(
+                self.login(),
+                retry_on_exception(self.api.get_available_matches, MAX_RETRIES),
+            )
+            placement = await self.build_accumulator(stake, table=table)
+            placement_result = await self.place_accumulator(placement)
+            bet_id = placement_result.get("bet_id")
+            if not bet_id:
+                logger.error("No bet_id returned from placement")
+                return
+            bet_info = await self.confirm_bet(bet_id)
+            # final reporting — write to console and log file
+            logger.info("FINAL: bet_id=%s stake=%.2f total_odd=%s potential_return=%s", bet_info["bet_id"], bet_info["stake"], bet_info["total_odd"], bet_info["potential_return"])
+            # persist to a local JSON log; the blocking write runs in a worker
+            # thread so a slow disk never stalls the event loop
+            await asyncio.to_thread(self._persist_bet, bet_info)
+        except Exception as e:
+            logger.exception("Run failed: %s", e)
+
+    def _persist_bet(self, bet_info: Dict[str, Any]):
+        self._persist_fp.write(orjson.dumps(bet_info, default=str, option=_ORJSON_OPTS))
+        self._persist_count += 1
+        if self._persist_count % PERSIST_FLUSH_EVERY == 0:
+            self._persist_fp.flush()
+        logger.info("Persisted bet to %s", BETS_FILE)
+
+# ===== If used as a scheduled script, support simple locking to avoid overlapping runs =====
+LOCKFILE = "accumulator_bot.lock"
+_lock_fd: Optional[int] = None
+
+def acquire_lock(timeout=0):
+    # kernel-enforced exclusion: no exists()/open() race, and a stale lockfile
+    # left by a crashed run is harmless because its flock died with the process
+    global _lock_fd
+    fd = os.open(LOCKFILE, os.O_CREAT | os.O_RDWR, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except (BlockingIOError, OSError):
+        os.close(fd)
+        return False
+    os.ftruncate(fd, 0)
+    os.write(fd, str(os.getpid()).encode())
+    _lock_fd = fd
+    return True
+
+def release_lock():
+    global _lock_fd
+    if _lock_fd is None:
+        return
+    try:
+        fcntl.flock(_lock_fd, fcntl.LOCK_UN)
+        os.close(_lock_fd)
+        os.unlink(LOCKFILE)
+    except Exception:
+        pass
+    finally:
+        _lock_fd = None
+
+# ===== CLI entrypoint =====
+async def main():
+    if not acquire_lock():
+        logger.error("Another instance appears to be running. Exiting.")
+        return
+    try:
+        api = MockBettingAPI()
+        bot = AccumulatorBot(api, USERNAME, PASSWORD)
+        logger.info("Starting accumulator bot run at %s", datetime.utcnow().isoformat())
+        # interleave N bets on the one event loop; wall time is ~max(latency), not the sum.
+        # the outer semaphore keeps a large NUM_BETS fan-out from swamping the process
+        run_sem = asyncio.Semaphore(os.cpu_count() or 4)
+        async def bounded_run():
+            async with run_sem:
+                await bot.run_once()
+        await asyncio.gather(*(bounded_run() for _ in range(NUM_BETS)))
+        logger.info("Run completed")
+    finally:
+        release_lock()
+
+if __name__ == "__main__":
+    asyncio.run(main())